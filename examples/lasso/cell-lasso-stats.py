@@ -80,19 +80,26 @@ input_filenames = args.filenames
 
 ##### END PARSING #####
 
-import os, sys, errno
+import os, sys, logging
 from datetime import datetime, timedelta
 
+logging.basicConfig(level=logging.INFO)
+
 import numpy as np
-from numpy.lib.recfunctions import append_fields, stack_arrays
+import matplotlib
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
+from matplotlib.backends.backend_pdf import PdfPages
+# Many figures are saved below; make simplifying and drawing long paths cheap.
+plt.rcParams.update({'path.simplify':True, 'path.simplify_threshold':1.0,
+                     'agg.path.chunksize':10000})
 
 from lmatools.grid.grid_collection import LMAgridFileCollection
-from lmatools.flash_stats import plot_energy_from_area_histogram, get_energy_spectrum_bins,  bin_center, plot_energies
+from lmatools.flash_stats import plot_energy_from_area_histogram, get_energy_spectrum_bins,  bin_center, plot_energies, bin_index, histogram_from_bin_index
 
 from lmatools.lasso.energy_stats import flash_size_stats, plot_flash_stat_time_series, plot_energy_stats, plot_tot_energy_stats
 from lmatools.lasso.length_stats import FractalLengthProfileCalculator
-from lmatools.lasso.cell_lasso_util import read_poly_log_file, polys_to_bounding_box, h5_files_from_standard_path, nc_files_from_standard_path
+from lmatools.lasso.cell_lasso_util import read_poly_log_file, polys_to_bounding_box, h5_files_from_standard_path, nc_files_from_standard_path, bounds_mask
 from lmatools.lasso.cell_lasso_timeseries import TimeSeriesPolygonFlashSubset
 
 from lmatools.lasso import empirical_charge_density as cd ###NEW
@@ -111,11 +118,7 @@ t_start, t_end = min(t_edges_polys), max(t_edges_polys)
 dt = timedelta(minutes=1)
 
 outdir=os.path.join(path_to_sort_results, 'figures-length/', outdir_name_from_user)
-try:
-    os.makedirs(outdir)
-except OSError as exc:
-    if exc.errno == errno.EEXIST and os.path.isdir(outdir):
-        pass
+os.makedirs(outdir, exist_ok=True)
 
 # =====
 # Load data from HDF5 files into a time series of events and flashes
@@ -128,7 +131,10 @@ flashes_in_poly = TimeSeriesPolygonFlashSubset(h5_filenames,
                         t_start, t_end, dt, 
                         min_points=min_events,
                         polys=polys, t_edges_polys=t_edges_polys)
-events_series, flashes_series = flashes_in_poly.get_event_flash_time_series()
+# All data grouped by time window, in window order; each window is a view into these tables.
+events_all, flashes_all, ev_offsets, fl_offsets = flashes_in_poly.get_windowed_event_flash_tables()
+events_series = [events_all[i0:i1] for i0, i1 in zip(ev_offsets[:-1], ev_offsets[1:])]
+flashes_series = [flashes_all[i0:i1] for i0, i1 in zip(fl_offsets[:-1], fl_offsets[1:])]
 
 #-----
 find_number_events = []
@@ -141,15 +147,12 @@ number_events = np.asarray(find_number_events).shape[0]
 # filter out events not part of flashes - NOT IMPLEMENTED
 def gen_filtered_time_series(events_series, flashes_series, bounds):
     for events, flashes in zip(events_series, flashes_series):
-        ev_good = np.ones(events.shape, dtype=bool)
-        fl_good = np.ones(flashes.shape, dtype=bool)
-        
-        for k, (v_min, v_max) in bounds.items():
-            if k in events.dtype.names:
-                ev_good &= (events[k] >= v_min) & (events[k] <= v_max)
-            if k in flashes.dtype.names:
-                fl_good &= (flashes[k] >= v_min) & (flashes[k] <= v_max)
-        events_filt, flashes_filt = (events[ev_good], flashes[fl_good])
+        ev_good = bounds_mask(events, bounds)
+        fl_good = bounds_mask(flashes, bounds)
+        # Integer indices are cheaper than boolean masks to apply to
+        # every column.
+        ev_idx, fl_idx = np.flatnonzero(ev_good), np.flatnonzero(fl_good)
+        events_filt, flashes_filt = (events[ev_idx], flashes[fl_idx])
         
         yield (events_filt, flashes_filt)
 
@@ -178,19 +181,33 @@ class FlashCentroidPlotter(object):
         ))
         self.colorbar = None
         self.scatters = []
+        self.lons, self.lats, self.starts = [], [], []
 
     def plot(self, flashes):
-        scart = self.evax.scatter(flashes['init_lon'], flashes['init_lat'],
-                      c=flashes['start'], s=4, cmap='viridis',
+        """ Queue up flashes for plotting. Nothing is drawn until finalize()
+            is called, so that all flashes are drawn by a single artist.
+        """
+        self.lons.append(flashes['init_lon'])
+        self.lats.append(flashes['init_lat'])
+        self.starts.append(flashes['start'])
+
+    def finalize(self):
+        if len(self.lons) == 0:
+            return
+        scart = self.evax.scatter(np.concatenate(self.lons),
+                      np.concatenate(self.lats),
+                      c=np.concatenate(self.starts), s=4, cmap='viridis',
                       vmin=self.t_sec_min, vmax=self.t_sec_max, edgecolor='none')
         if self.colorbar is None:
             self.colorbar = plt.colorbar(scart, ax=self.evax)
         self.scatters.append(scart)
+        self.lons, self.lats, self.starts = [], [], []
 
 flash_location_plotter = FlashCentroidPlotter(min(flashes_in_poly.t_edges_seconds),
                                               max(flashes_in_poly.t_edges_seconds))
 for flashes in flashes_series:
     flash_location_plotter.plot(flashes)
+flash_location_plotter.finalize()
 flash_ctr_filename = 'flash_ctr_{0}_{1}.png'.format(t_start.strftime('%y%m%d%H%M%S'),
                                                     t_end.strftime('%y%m%d%H%M%S'))
 flash_location_plotter.fig.savefig(os.path.join(outdir, flash_ctr_filename))
@@ -234,33 +251,28 @@ time_series = gen_flash_summary_time_series(events_series, flashes_series,
                                             length_profiler)
 size_stats, IC_profiles, CG_profiles = zip(*time_series)
 
-size_stats = stack_arrays(size_stats)
+# every window's stats have the same dtype, so they can simply be concatenated
+size_stats = np.concatenate(size_stats)
 iso_start, iso_end = flashes_in_poly.t_edges_to_isoformat(as_start_end=True)
-# assume here that iso_start and iso_end are identical-length strings,
-# as they should be if the iso format is worth anything.
-size_stats = append_fields(size_stats, ('start_isoformat','end_isoformat'),
-                                         data=(iso_start, iso_end), usemask=False)                                      
 # =====
 # Write flash size stats data (see harvest_flash_timeseries) and plot moment time series
 # =====
-def write_size_stat_data(outfile, size_stats):
-    stat_keys = ('start_isoformat','end_isoformat', 'number', 'mean', 'variance',
+def write_size_stat_data(outfile, size_stats, iso_start, iso_end):
+    stat_keys = ('number', 'mean', 'variance',
                  'skewness', 'kurtosis', 'energy', 'energy_per_flash','total_energy','specific_energy')
     header = "# start_isoformat, end_isoformat, number, mean, variance, skewness, kurtosis, energy, energy_per_flash, total_energy, specific_energy\n"
     line_template = "{0}, {1}, {2}, {3}, {4}, {5}, {6}, {7}, {8}, {9}, {10}\n"
-    f = open(outfile, 'w')
-    #for start_t, end_t, stats in zip(starts, ends, size_stats):
-    f.write(header)
-    for stats in size_stats:
-        stat_vals = [stats[k] for k in stat_keys]
-        line = line_template.format(*stat_vals)
-        f.write(line)
-    f.close()
+    # Format the float32 stats themselves, which gives their shortest repr
+    with open(outfile, 'w') as f:
+        f.write(header)
+        for start_t, end_t, stats in zip(iso_start, iso_end, size_stats):
+            stat_vals = [stats[k] for k in stat_keys]
+            f.write(line_template.format(start_t, end_t, *stat_vals))
 
 stats_filename = os.path.join(outdir,'flash_stats.csv')
 stats_figure = os.path.join(outdir,'flash_stats_{0}_{1}.pdf'.format(t_start.strftime('%y%m%d%H%M%S'),
                                                     t_end.strftime('%y%m%d%H%M%S')))
-write_size_stat_data(stats_filename, size_stats)
+write_size_stat_data(stats_filename, size_stats, iso_start, iso_end)
 fig = plot_flash_stat_time_series(flashes_in_poly.base_date, flashes_in_poly.t_edges, size_stats)
 fig.savefig(stats_figure)
 
@@ -311,12 +323,21 @@ if do_3d:
 if do_energy_spectra:
     footprint_bin_edges = get_energy_spectrum_bins()
     spectrum_save_file_base = os.path.join(outdir, 'energy_spectrum_{0}_{1}.pdf')
-    for flashes, t0, t1 in zip(flashes_series, flashes_in_poly.t_edges[:-1], flashes_in_poly.t_edges[1:]):
-        histo, edges = np.histogram(flashes['area'], bins=footprint_bin_edges)
-        spectrum_save_file = spectrum_save_file_base.format(t0.strftime('%y%m%d%H%M%S'),
-                                                            t1.strftime('%y%m%d%H%M%S'))
-        plot_energy_from_area_histogram(histo, edges,
-                        save=spectrum_save_file, duration=(t1-t0).total_seconds())
+    n_bins = footprint_bin_edges.shape[0] - 1
+    # Bin each window's flashes by area once, and reuse for all the spectra.
+    area_bin_idx_series = [bin_index(flashes['area'], footprint_bin_edges)
+                           for flashes in flashes_series]
+    # All the spectra go in one multi-page PDF, one page per time window
+    with PdfPages(spectrum_save_file_base.format(t_start.strftime('%y%m%d%H%M%S'),
+                                                 t_end.strftime('%y%m%d%H%M%S'))) as spectrum_pages:
+        for area_bin_idx, t0, t1 in zip(area_bin_idx_series, flashes_in_poly.t_edges[:-1], flashes_in_poly.t_edges[1:]):
+            histo = histogram_from_bin_index(area_bin_idx, n_bins)
+            edges = footprint_bin_edges
+            spectrum_save_file = spectrum_save_file_base.format(t0.strftime('%y%m%d%H%M%S'),
+                                                                t1.strftime('%y%m%d%H%M%S'))
+            plot_energy_from_area_histogram(histo, edges,
+                            save=spectrum_save_file, duration=(t1-t0).total_seconds(),
+                            pages=spectrum_pages)
 
     # =========================================#
     # Energy Spectrum from charge density:     # 
@@ -346,7 +367,8 @@ if do_energy_spectra:
                   flashes_in_poly.t_edges,
                   spectrum_save_file_base_en,
                   which_energy,
-                  title)
+                  title,
+                  area_bin_idx_series=area_bin_idx_series)
 
     # ENERGY SPECTRA FOR SPECIFIC ENERGY:
     if do_3d:
@@ -363,7 +385,8 @@ if do_energy_spectra:
                       flashes_in_poly.t_edges,
                       spectrum_save_file_base_specific,
                       which_energy,
-                      title)
+                      title,
+                      area_bin_idx_series=area_bin_idx_series)
 
 # =====
 # NetCDF grid processing
@@ -375,7 +398,14 @@ field_labels = ('Flash coverage (count per pixel)', 'Flash initation (count per
 grid_ranges = ((1, 1000), (1,100), (1, 100000),  (1, 100000.0), (1,1000), (1, 100000), (1e6, 1e12))
 field_ids_to_run = (0, 1, 2, 3, 4, 5, 6)
 
-def plot_lasso_grid_subset(fig,datalog, t,xedge,yedge,data,grid_lassos,field_name,basedate,grid_range, axis_range):
+def plot_lasso_grid_subset(fig,ax,mesh,datalog, t,xedge,yedge,data,grid_lassos,field_name,basedate,grid_range, axis_range):
+    """ Plot data on ax, and log summary stats for the grid cells in the lasso.
+        mesh is None, or the dictionary returned by a previous call, which
+        holds the pcolormesh artist, its colorbar, and the grid edges. If the
+        grid edges are unchanged, the existing pcolormesh is reused by
+        updating its data. Otherwise a new pcolormesh and colorbar are made.
+        Returns mesh.
+    """
     from scipy.stats import scoreatpercentile
     from matplotlib.cm import get_cmap
     import matplotlib.colors
@@ -385,52 +415,58 @@ def plot_lasso_grid_subset(fig,datalog, t,xedge,yedge,data,grid_lassos,field_nam
     x = (xedge[1:]+xedge[:-1])/2.0
     y = (yedge[1:]+yedge[:-1])/2.0
 
-    xmesh, ymesh = np.meshgrid(x, y)
-
-    assert (xmesh.shape == ymesh.shape == data.shape)
-
-    N = data.size
+    # Sparse meshes broadcast to the grid shape as read-only views, with no
+    # copies. broadcast_to will fail if the grid doesn't match data.
+    xmesh, ymesh = np.meshgrid(x, y, sparse=True)
+    xmesh = np.broadcast_to(xmesh, data.shape)
+    ymesh = np.broadcast_to(ymesh, data.shape)
 
     # in these grids, Y moves along the zeroth index, X moves along the first index
 
-    a = np.empty((N,), dtype=[('t','f4'), ('lon', 'f4'), ('lat','f4'), (field_name, data.dtype)])
-    a['t'] = (t-basedate).total_seconds() + 1.0 # add a bit of padding to make sure it's within the time window
-    a['lat'] = ymesh.flatten()
-    a['lon'] = xmesh.flatten()
-    a[field_name] = data.flatten()
+    t_sec = (t-basedate).total_seconds() + 1.0 # add a bit of padding to make sure it's within the time window
+    values = data.ravel()
 
-    nonzero = a[field_name] > 0
-    good = grid_lassos.filter_mask(a)
-    filtered = a[good]
-    nonzero_filtered = a[good & nonzero]
+    nonzero = values > 0
+    good = grid_lassos.filter_mask_soa(t_sec, xmesh, ymesh).ravel()
+    filtered = values[good]
+    nonzero_filtered = values[good & nonzero]
     # set up an array for use in pcolor
-    masked_nonzero_filtered = a.view(np.ma.MaskedArray)
-    masked_nonzero_filtered.shape = data.shape
-    masked_nonzero_filtered.mask = (good & nonzero)==False
+    masked_nonzero_filtered = np.ma.masked_array(data,
+                                    mask=((good & nonzero)==False).reshape(data.shape))
 
-    ax=fig.add_subplot(111)
     ax.set_title(str(t))
-    
-
-    art = ax.pcolormesh(xedge, yedge,
-                        masked_nonzero_filtered[field_name],
-                        vmin=grid_range[0], vmax=grid_range[1],
-                        cmap=cmap, norm=norm)
 
-    # ax.plot(lon_range,lat_range,'ok--',alpha=0.5)
-    art.set_rasterized(True)
-    cbar = fig.colorbar(art)
-    cbar.solids.set_rasterized(True) 
-    ax.axis(axis_range)
+    same_grid = ((mesh is not None) and
+                 np.array_equal(mesh['xedge'], xedge) and
+                 np.array_equal(mesh['yedge'], yedge))
+    if same_grid:
+        mesh['art'].set_array(masked_nonzero_filtered.ravel())
+    else:
+        if mesh is not None:
+            mesh['cbar'].remove()
+            mesh['art'].remove()
+        art = ax.pcolormesh(xedge, yedge,
+                            masked_nonzero_filtered,
+                            vmin=grid_range[0], vmax=grid_range[1],
+                            cmap=cmap, norm=norm)
+
+        # ax.plot(lon_range,lat_range,'ok--',alpha=0.5)
+        art.set_rasterized(True)
+        cbar = fig.colorbar(art, ax=ax)
+        cbar.solids.set_rasterized(True) 
+        ax.axis(axis_range)
+        mesh = {'art':art, 'cbar':cbar,
+                'xedge':np.array(xedge), 'yedge':np.array(yedge)}
 
     if nonzero_filtered.size > 0:
-        v = filtered[field_name]
-        vnz = nonzero_filtered[field_name]
+        v = filtered
+        vnz = nonzero_filtered
         percentiles = scoreatpercentile(vnz, (5,50,95))
         row = map(str, (t.isoformat(), v.max(), v.sum())+tuple(percentiles))
     else:
         row = map(str, (t, 0 , 0, 0.0, 0.0, 0.0))
     datalog.write(', '.join(row)+'\n')
+    return mesh
 
 
 for field_id in field_ids_to_run:
@@ -443,11 +479,7 @@ for field_id in field_ids_to_run:
     grid_range = grid_ranges[field_id]
 
     fig_outdir = os.path.join(outdir,'grids_{0}'.format(field_name))
-    try:
-      os.makedirs(fig_outdir)
-    except OSError as exc:
-        if exc.errno == errno.EEXIST and os.path.isdir(fig_outdir):
-            pass
+    os.makedirs(fig_outdir, exist_ok=True)
 
     gfc = LMAgridFileCollection(nc_filenames, field_name, x_name='longitude', y_name='latitude')
     grid_lassos = flashes_in_poly.grid_lassos
@@ -458,13 +490,15 @@ for field_id in field_ids_to_run:
     datalog.write('time (ISO), max count per grid box, sum of all grid boxes, 5th percentile, 50th percentile, 95th percentile\n')
 
     fig=plt.figure(figsize=(12,10))
+    ax=fig.add_subplot(111)
+    mesh = None
     lon_range, lat_range = polys_to_bounding_box(flashes_in_poly.polys)
     axis_range = lon_range+lat_range
 
     for t, xedge, yedge, data in gfc:
         if (t >= t_start) & (t <= t_end):
-            plot_lasso_grid_subset(fig,datalog,t,xedge,yedge,data,grid_lassos,field_name,basedate,grid_range, axis_range)
+            mesh = plot_lasso_grid_subset(fig,ax,mesh,datalog,t,xedge,yedge,data,grid_lassos,field_name,basedate,grid_range, axis_range)
             fig.savefig(os.path.join(fig_outdir, '{0}_{1}.png'.format(field_name, t.strftime('%Y%m%d_%H%M%S'))))
-            fig.clf()
 
+    plt.close(fig)
     datalog.close()
@@ -58,21 +58,16 @@ def vertical_length_distribution(src_alt, simplex_alt, simplex_lengths,
     # d_alt = 0.5
     d_alt = alt_bins[1:]-alt_bins[:-1]
     # alt_bins = np.arange(0.0,max_alt+d_alt, d_alt)
-    bin_total_length = np.zeros(alt_bins.shape[0]-1, dtype=float)
-    bin_total_src = np.zeros(alt_bins.shape[0]-1, dtype=float)
-    # bin_total_length_sq = np.zeros(alt_bins.shape[0]-1, dtype=float)
+    n_bins = alt_bins.shape[0]-1
     tri_bin_idx = np.digitize(simplex_alt, alt_bins)
     src_bin_idx = np.digitize(src_alt,alt_bins)
-    tri_bin_idx[tri_bin_idx>(bin_total_length.shape[0]-1)]=bin_total_length.shape[0]-1
-    src_bin_idx[src_bin_idx>(bin_total_src.shape[0]-1)]=bin_total_src.shape[0]-1
+    tri_bin_idx[tri_bin_idx>(n_bins-1)]=n_bins-1
+    src_bin_idx[src_bin_idx>(n_bins-1)]=n_bins-1
 
-    for idx in src_bin_idx:
-        bin_total_src[idx] += 1
-
-    for lw,idx in zip(simplex_lengths,tri_bin_idx):
-        bin_total_length[idx]+=lw
-        # bin_total_length_sq[idx] += lw*lw
-    # bin_total_length[tri_bin_idx] += length_weighted
+    # Accumulate the counts and lengths in each bin with one call each
+    bin_total_src = np.bincount(src_bin_idx, minlength=n_bins).astype(float)
+    bin_total_length = np.bincount(tri_bin_idx, weights=simplex_lengths,
+                                   minlength=n_bins)
     if norm==True:
         return alt_bins, bin_total_src/d_alt, bin_total_length/d_alt
     else:
@@ -81,6 +76,30 @@ def vertical_length_distribution(src_alt, simplex_alt, simplex_lengths,
 
 def bin_center(bins):
     return (bins[:-1] + bins[1:]) / 2.0
+
+def bin_index(a, bin_edges):
+    """ Return the index of the bin in (sorted) bin_edges containing each value
+        in a, following the np.histogram convention that all but the last bin
+        are half-open and the last bin includes its right edge.
+        Values outside the bins are given an index of -1.
+    """
+    # a is read more than once below, so gather it once if it is a strided
+    # column of a record array. No copy is made if a is already contiguous.
+    a = np.ascontiguousarray(a)
+    n_bins = bin_edges.shape[0] - 1
+    idx = np.searchsorted(bin_edges, a, side='right') - 1
+    idx[a == bin_edges[-1]] = n_bins - 1
+    idx[idx >= n_bins] = -1
+    return idx
+
+def histogram_from_bin_index(idx, n_bins, weights=None):
+    """ Equivalent to np.histogram, given the bin index returned by bin_index.
+        Returns the histogram only (not the bin edges).
+    """
+    good = idx >= 0
+    if weights is not None:
+        weights = weights[good]
+    return np.bincount(idx[good], weights=weights, minlength=n_bins)
     
 
 def energy_plot_setup(fig=None, subplot=111, bin_unit='km'):
@@ -137,8 +156,12 @@ def calculate_energy_from_area_histogram(histo, bin_edges, duration, scaling=1.0
     specific_energy *= scaling
     return flash_1d_extent, specific_energy
 
-def plot_energy_from_area_histogram(histo, bin_edges, bin_unit='km', save=False, fig=None, color_cycle_length=1, color_map='gist_earth', duration=600.0):
-    """ Histogram for flash width vs. count """
+def plot_energy_from_area_histogram(histo, bin_edges, bin_unit='km', save=False, fig=None, color_cycle_length=1, color_map='gist_earth', duration=600.0, pages=None):
+    """ Histogram for flash width vs. count 
+    
+        If pages is a matplotlib PdfPages instance, the plot is added as a new
+        page of that file, and the filename in save is only used for the title.
+    """
     
     fig, spectrum_ax, fivethirds_line_artist, spectrum_artist = energy_plot_setup()
     spectrum_ax.set_title(save.split('/')[-1].split('.')[0])
@@ -146,7 +169,11 @@ def plot_energy_from_area_histogram(histo, bin_edges, bin_unit='km', save=False,
     flash_1d_extent, specific_energy = calculate_energy_from_area_histogram(histo, bin_edges, duration)
     spectrum_artist.set_data(flash_1d_extent, specific_energy)
     
-    if save==False:
+    if pages is not None:
+        import matplotlib.pyplot as plt
+        pages.savefig(fig)
+        plt.close(fig)
+    elif save==False:
         plt.show()
     else:
         # ax.set_title(save)
@@ -155,7 +182,8 @@ def plot_energy_from_area_histogram(histo, bin_edges, bin_unit='km', save=False,
 
 #######ADDED ESTIMATED ENERGY ####################
 def plot_energies(footprint_bin_edges,time_array,scalar_map,flashes_series,
-                    flashes_in_poly_edges,spectrum_save_file_base_en,which_energy,title):
+                    flashes_in_poly_edges,spectrum_save_file_base_en,which_energy,title,
+                    area_bin_idx_series=None):
     '''
     Plots estimated total and specific energy fields in .h5 files. 
     Arguments:
@@ -168,6 +196,8 @@ def plot_energies(footprint_bin_edges,time_array,scalar_map,flashes_series,
             -) save path:            spectrum_save_file_base_en
             -) energy field:         which_energy
             -) title of plot:        title             
+            -) bin_index(flashes['area'], footprint_bin_edges) for each
+               flash table, if already known: area_bin_idx_series
     '''
     import matplotlib.pyplot as plt
     s_m = scalar_map
@@ -178,17 +208,39 @@ def plot_energies(footprint_bin_edges,time_array,scalar_map,flashes_series,
     tmin = min(flashes_in_poly_edges)
     tmax = max(flashes_in_poly_edges)
     
-    flash_1d_extent = bin_center(np.sqrt(footprint_bin_edges))
+    # These don't change from one time window to the next
+    sqrt_edges = np.sqrt(footprint_bin_edges)
+    flash_1d_extent = bin_center(sqrt_edges)
+    inv_sqrt_extent = 1.0/np.sqrt(flash_1d_extent)
+    n_bins = footprint_bin_edges.shape[0] - 1
+    n_windows = len(flashes_in_poly_edges) - 1
+    all_histos = np.zeros((n_windows, n_bins), dtype=float)
+    has_data = np.zeros(n_windows, dtype=bool)
     for f, (flashes, t0, t1) in enumerate(zip(flashes_series, flashes_in_poly_edges[:-1], flashes_in_poly_edges[1:])):
         if flashes.shape[0] > 1:
             # If there is no data in this time window, skip it
-            histo_cd, edges_cd = np.histogram(np.sqrt(flashes['area']), 
-                                              bins=np.sqrt(footprint_bin_edges), 
-                                              weights=np.abs(flashes[which_energy]))        
-            estimated, = ax_energy.loglog(flash_1d_extent[:],
-                                np.abs(np.asarray(histo_cd))/np.sqrt(flash_1d_extent),
-                                color=s_m.to_rgba(np.asarray(time_array)[f]),
-                                alpha=0.7); 
+            # Binning sqrt(area) on sqrt(edges) is the same as binning area on edges
+            if area_bin_idx_series is None:
+                area_bin_idx = bin_index(flashes['area'], footprint_bin_edges)
+            else:
+                area_bin_idx = area_bin_idx_series[f]
+            all_histos[f] = histogram_from_bin_index(area_bin_idx, n_bins,
+                                                weights=np.abs(flashes[which_energy]))
+            has_data[f] = True
+
+    # Draw the spectra for all time windows as a single artist
+    ax_energy.set_xscale('log')
+    ax_energy.set_yscale('log')
+    if has_data.any():
+        from matplotlib.collections import LineCollection
+        spectra = np.abs(all_histos[has_data])*inv_sqrt_extent
+        segments = np.empty(spectra.shape + (2,), dtype=float)
+        segments[:,:,0] = flash_1d_extent
+        segments[:,:,1] = spectra
+        colors = s_m.to_rgba(np.asarray(time_array)[:n_windows][has_data])
+        estimated = LineCollection(segments, colors=colors, alpha=0.7)
+        ax_energy.add_collection(estimated)
+        ax_energy.autoscale_view()
                                                    
     if which_energy == 'Energy' or which_energy == 'total_energy':
         ax_energy.set_ylim(1e7,1e13)
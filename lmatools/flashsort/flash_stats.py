@@ -8,6 +8,11 @@ from scipy.spatial import Delaunay, ConvexHull
 from scipy.special import factorial
 from scipy.spatial.qhull import QhullError
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
 from lmatools.lasso import empirical_charge_density as cd
 
 # logger = logging.getLogger('FlashAutorunLogger')
@@ -70,6 +75,18 @@ def poly_area(x,y):
     return area
     
 
+def _simplex_determinants(q):
+    """ Determinant of each 3x3 matrix in q, which has shape (N_simplices, 3, 3) """
+    det = np.empty(q.shape[0], dtype=np.float64)
+    for k in range(q.shape[0]):
+        det[k] = (q[k,0,0]*(q[k,1,1]*q[k,2,2] - q[k,1,2]*q[k,2,1])
+                - q[k,0,1]*(q[k,1,0]*q[k,2,2] - q[k,1,2]*q[k,2,0])
+                + q[k,0,2]*(q[k,1,0]*q[k,2,1] - q[k,1,1]*q[k,2,0]))
+    return det
+
+if njit is not None:
+    _simplex_determinants = njit(cache=True)(_simplex_determinants)
+
 def hull_volume(xyz):
     """ Calculate the volume of the convex hull of 3D (X,Y,Z) LMA data.
         xyz is a (N_points, 3) array of point locations in space. """
@@ -85,8 +102,12 @@ def hull_volume(xyz):
     # Credit Pauli Virtanen, Oct 14, 2012, scipy-user list
     
     q = vertices[:,:-1,:] - vertices[:,-1,None,:]
-    simplex_volumes = (1.0 / factorial(q.shape[-1])) * np.fromiter(
-           (np.linalg.det(q[k,:,:]) for k in range(tri.nsimplex)) , dtype=float)
+    if njit is not None:
+        det = _simplex_determinants(np.ascontiguousarray(q, dtype=np.float64))
+    else:
+        # numpy broadcasts det over the leading (simplex) dimension
+        det = np.linalg.det(q)
+    simplex_volumes = (1.0 / factorial(q.shape[-1])) * det
     # print vertices.shape # number of simplices, points per simplex, coords
     # print q.shape
     
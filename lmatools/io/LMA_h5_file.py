@@ -3,6 +3,14 @@ from __future__ import print_function
 import numpy as np
 from datetime import datetime, timedelta
 import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# HDF5 chunk cache used when reading LMA files. Whole tables are read at once,
+# so make the cache large enough to hold many chunks.
+H5_CHUNK_CACHE_SIZE = 128*1024*1024 # bytes
+H5_CHUNK_CACHE_NSLOTS = 10007 # prime number of hash slots, per HDF5 docs
 
 def to_seconds(dt):
     'convert datetime.timedelta object to float seconds'
@@ -68,7 +76,7 @@ class LMAh5Collection(object):
         # populate _time_lookup by calling _all_times
         self._time_lookup = {}
         self.times = [t for t in self._all_times()]
-        print("collection times = ", self.times)
+        logger.info("collection times = %s", self.times)
         self.times.sort()
 
         if base_date is None:
@@ -83,9 +91,9 @@ class LMAh5Collection(object):
             the frame start times. _time_lookup goes from
             datetime->(h5 filename, table_name).
         """
-        h5 = LMAh5File(fname, min_points=self.min_points)
-        for t_start, table_name in zip(h5.start_times, h5.table_names):
-            self._time_lookup[t_start] = (fname, table_name)
+        with LMAh5File(fname, min_points=self.min_points) as h5:
+            for t_start, table_name in zip(h5.start_times, h5.table_names):
+                self._time_lookup[t_start] = (fname, table_name)
         yield t_start
 
 
@@ -101,11 +109,11 @@ class LMAh5Collection(object):
         to be referenced with respect to self.base_date.
         """
         fname, table_name = self._time_lookup[t0]
-        h5 = LMAh5File(fname, min_points=self.min_points)
-        events, flashes = h5.data_for_table(table_name)
+        with LMAh5File(fname, min_points=self.min_points) as h5:
+            events, flashes = h5.data_for_table(table_name)
 
         extra_dt = to_seconds(h5.base_date - self.base_date)
-        print("data for time extra dt = {0}", extra_dt)
+        logger.debug("data for time extra dt = %s", extra_dt)
         events['time'] += extra_dt
         flashes['start'] += extra_dt
 
@@ -162,7 +170,9 @@ class LMAh5File(object):
             been tested with HDF5 LMA data files with more than one table.
         """
         import tables
-        self.h5 = tables.open_file(filename)
+        self.h5 = tables.open_file(filename, mode='r',
+                                   CHUNK_CACHE_SIZE=H5_CHUNK_CACHE_SIZE,
+                                   CHUNK_CACHE_NSLOTS=H5_CHUNK_CACHE_NSLOTS)
         self.min_points = min_points
         table_names = list(self.h5.root.events._v_children.keys())
         start_times = [datetime(*getattr(self.h5.root.events,
@@ -186,7 +196,19 @@ class LMAh5File(object):
             self.table_metadata[name] = {'start_time': t0,
                                          'start_date': date}
 
-        print(self.start_times, self.table_names, self.table_metadata)
+        logger.debug("%s %s %s", self.start_times, self.table_names, self.table_metadata)
+
+    def close(self):
+        """ Close the HDF5 file, releasing its chunk cache. Arrays already
+            returned by data_for_table remain valid.
+        """
+        self.h5.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def data_for_table(self, table_name):
         """ Return events, flashes as numpy arrays with a named dtype.
@@ -198,14 +220,13 @@ class LMAh5File(object):
         """
         table_date = self.table_metadata[table_name]['start_date']
         extra_dt = to_seconds(table_date - self.base_date)
-        print("data for table dt = {0}", extra_dt)
+        logger.debug("data for table dt = %s", extra_dt)
 
         flashes = getattr(self.h5.root.flashes, table_name)
-        fl_dtype = flashes.dtype
-        flashes = np.fromiter(
-                  (fl[:] for fl in flashes if fl['n_points'] >= self.min_points),
-                  dtype=fl_dtype
-                  )
+        # Select flashes in a single in-kernel query over the whole table
+        # instead of iterating over rows in Python.
+        flashes = flashes.read_where('n_points >= min_points',
+                                     condvars={'min_points':self.min_points})
         events = getattr(self.h5.root.events, table_name)[:]
 
         events['time'] += extra_dt
@@ -5,6 +5,82 @@ from datetime import datetime
 from lmatools.io.LMA_h5_file import LMAh5Collection
 from lmatools.grid.make_grids import time_edges, seconds_since_start_of_day
 from lmatools.grid.density_to_files import ArrayChopper, stack_chopped_arrays
+from lmatools.stream.subset import prefetch
+
+class SoAFlashes(object):
+    """ Column-oriented (structure of arrays) version of an LMA events or
+        flashes table. Each named field of the original record array is
+        stored as its own contiguous 1D array, so that math on one column
+        doesn't stride over the whole record.
+
+        Indexing with a field name returns that column, and raises ValueError
+        if there is no such field, as for a record array. Indexing with
+        an integer returns that row as a record, as for a record array, and
+        anything else (slice, boolean mask, integer indices) returns a new
+        SoAFlashes with that index applied to every column.
+
+        self.dtype is the dtype of the original record array, so that
+        self.dtype.names can be checked as usual. Iteration yields records,
+        for consumers that work flash-by-flash.
+    """
+    def __init__(self, columns, dtype, shape):
+        self.columns = columns
+        self.dtype = dtype
+        self.shape = shape
+
+    @classmethod
+    def from_records(cls, a):
+        columns = dict((k, np.ascontiguousarray(a[k])) for k in a.dtype.names)
+        return cls(columns, a.dtype, a.shape)
+
+    @classmethod
+    def from_record_chunks(cls, chunks):
+        """ Build one table from a sequence of record arrays of the same
+            dtype, in order. Each column is concatenated directly from the
+            chunks, without first combining them into a record array.
+            
+            Raises ValueError if there are no chunks, since the dtype is then
+            unknown.
+        """
+        if len(chunks) == 0:
+            raise ValueError("no chunks to combine")
+        dtype = chunks[0].dtype
+        columns = dict((k, np.concatenate([c[k] for c in chunks])) 
+                       for k in dtype.names)
+        shape = (sum(c.shape[0] for c in chunks),)
+        return cls(columns, dtype, shape)
+
+    def to_records(self):
+        """ Return a record array with the original dtype """
+        a = np.empty(self.shape, dtype=self.dtype)
+        for k, v in self.columns.items():
+            a[k] = v
+        return a
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            try:
+                return self.columns[key]
+            except KeyError:
+                raise ValueError("no field of name {0}".format(key))
+        if isinstance(key, (int, np.integer)):
+            # a single flash, as a record
+            rec = np.empty((), dtype=self.dtype)
+            for k, v in self.columns.items():
+                rec[k] = v[key]
+            return rec[()]
+        if isinstance(key, np.ndarray) and key.dtype == bool:
+            # Scan the mask once, not once per column
+            key = np.flatnonzero(key)
+        columns = dict((k, v[key]) for k, v in self.columns.items())
+        shape = next(iter(columns.values())).shape
+        return SoAFlashes(columns, self.dtype, shape)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __iter__(self):
+        return iter(self.to_records())
 
 class TimeSeriesGenericFlashSubset(object):
     """ This class is not meant to be used alone. A subclass which provides
@@ -50,9 +126,11 @@ class TimeSeriesGenericFlashSubset(object):
             An example of consuming and stacking up all data is 
             in self.get_event_flash_time_series.
             
+            The next data file is read in the background while the current 
+            one is chopped up.
         """
 
-        for events, flashes in self.lma:
+        for events, flashes in prefetch(self.lma):
             # Get a list of subarrays corresponding to the time windows given
             # by self.t_edges
             chopped_events = self.t_chopper.chop(events, edge_key='time')
@@ -74,6 +152,37 @@ class TimeSeriesGenericFlashSubset(object):
             flashes.append(fl_chop)
         return stack_chopped_arrays(events), stack_chopped_arrays(flashes)
 
+    def get_windowed_event_flash_tables(self):
+        """ Return events, flashes, ev_offsets, fl_offsets
+        
+            events and flashes are each a single SoAFlashes table with 
+            the data for all time windows, grouped by window in time order.
+            Within a window, data are in the order they were read, as for
+            get_event_flash_time_series. The offsets are N+1 indices 
+            corresponding to N+1 self.t_edges, such that the data for window i
+            are events[ev_offsets[i]:ev_offsets[i+1]], and likewise for 
+            flashes. These slices are views and are not copied.
+        """
+        ev_chops = []
+        fl_chops = []
+        for ev_chop, fl_chop in self.gen_chopped_events_flashes():
+            ev_chops.append(ev_chop)
+            fl_chops.append(fl_chop)
+        events, ev_offsets = self._combine_chops(ev_chops)
+        flashes, fl_offsets = self._combine_chops(fl_chops)
+        return events, flashes, ev_offsets, fl_offsets
+    
+    def _combine_chops(self, chop_sequence):
+        # Order the chunks from each file window by window, as in 
+        # stack_chopped_arrays, and then copy each column only once.
+        if len(chop_sequence) == 0:
+            raise ValueError("No data were read; check that there are LMA HDF5 files for this time series")
+        windows = list(zip(*chop_sequence))
+        chunks = [a for window in windows for a in window]
+        window_lens = [sum(a.shape[0] for a in window) for window in windows]
+        offsets = np.concatenate(([0], np.cumsum(window_lens, dtype=int)))
+        return SoAFlashes.from_record_chunks(chunks), offsets
+
 class TimeSeriesFlashSubset(TimeSeriesGenericFlashSubset):
     def __init__(self, h5_filenames, t_start, t_end, dt, base_date=None, min_points=10):
         """ 
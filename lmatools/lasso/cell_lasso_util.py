@@ -6,6 +6,11 @@ import logging, json, operator
 
 import numpy as np
 
+try:
+    import numexpr as ne
+except ImportError:
+    ne = None
+
 from lmatools.io.LMA_h5_file import parse_lma_h5_filename
 
 def gen_polys(filename, time_keys=None):
@@ -136,6 +141,33 @@ def read_poly_log_file(filename, lat_lon_filter=None):
     
     return (flash_stat_polys, t_edges)
     
+def bounds_mask(a, bounds):
+    """ Return a boolean mask for a that is True where all columns named in
+        bounds are within (v_min, v_max). Keys in bounds that are not columns
+        of a are ignored. a may be a named array or an SoAFlashes table.
+        
+        If numexpr is installed it is used to evaluate all the comparisons
+        in one pass over the columns.
+    """
+    keys = [k for k in bounds if k in a.dtype.names]
+    if len(keys) == 0:
+        return np.ones(a.shape, dtype=bool)
+    if (ne is not None) and (a.shape[0] > 0):
+        local_dict = {}
+        terms = []
+        for i, k in enumerate(keys):
+            local_dict['c{0}'.format(i)] = a[k]
+            local_dict['lo{0}'.format(i)], local_dict['hi{0}'.format(i)] = bounds[k]
+            terms.append('((c{0} >= lo{0}) & (c{0} <= hi{0}))'.format(i))
+        return ne.evaluate(' & '.join(terms), local_dict=local_dict)
+    in_bounds = []
+    for k in keys:
+        v_min, v_max = bounds[k]
+        # pull the column out once
+        col = a[k]
+        in_bounds.append((col >= v_min) & (col <= v_max))
+    return np.logical_and.reduce(in_bounds)
+
 def polys_to_bounding_box(polys):
     """ Given a sequence of (x,y) tuples in polys, return xspan, yspan
         where xspan is a tuple of left, right bounds
@@ -302,6 +302,22 @@ def plot_tot_energy_stats(size_stats, basedate, t_edges, outdir):
 # In[6]:
 
 from stormdrain.support.matplotlib.poly_lasso import LassoFilter
+from matplotlib.path import Path
+
+def _in_bbox(x, y, v_min, v_max):
+    """ Mask for x, y within the box with corners v_min=(xmin, ymin)
+        and v_max=(xmax, ymax) """
+    return (x >= v_min[0]) & (x <= v_max[0]) & (y >= v_min[1]) & (y <= v_max[1])
+
+def _in_poly(x, y, path, v_min, v_max):
+    """ Mask for x, y inside the polygon path, whose bounding box is 
+        given by v_min, v_max, as for _in_bbox. Only points in the bounding box are passed
+        to the (more expensive) point in polygon test.
+    """
+    inpoly = _in_bbox(x, y, v_min, v_max)
+    if inpoly.any():
+        inpoly[inpoly] = path.contains_points(np.column_stack((x[inpoly], y[inpoly])))
+    return inpoly
 
 class TimeSeriesPolygonLassoFilter(object):
     """ Given a series of N polygons which are valid between N+1 time edges,
@@ -335,14 +351,20 @@ class TimeSeriesPolygonLassoFilter(object):
         polys = kwargs.pop('polys', [])
         
         self.poly_lookup = {}
+        # (path, (xmin, ymin), (xmax, ymax)) for each polygon, with the same keys
+        # as poly_lookup. The bounding box is used to quickly reject points 
+        # before the full point in polygon test.
+        self.bbox_lookup = {}
         
         for iv, verts in enumerate(polys):
             t0 = (self.time_edges[iv] - self.basedate).total_seconds()
             t1 = (self.time_edges[iv+1] - self.basedate).total_seconds()
+            verts = np.asarray(verts)
             lassofilter = LassoFilter(coord_names=self.coord_names)
-            lassofilter.verts = np.asarray(verts)
+            lassofilter.verts = verts
             self.poly_lookup[(t0, t1)] = lassofilter
-                                
+            self.bbox_lookup[(t0, t1)] = (Path(verts), verts.min(axis=0), verts.max(axis=0))
+
     def filter_mask(self, a):
         """ Filter out all points in a that belong to any of the polys.
             
@@ -353,14 +375,38 @@ class TimeSeriesPolygonLassoFilter(object):
         good = np.zeros(a.shape, dtype=bool)
         
         t = a[self.time_key]
-        for (t0, t1), poly_target in self.poly_lookup.items():
+        x, y = a[self.coord_names[0]], a[self.coord_names[1]]
+        for (t0, t1), (path, v_min, v_max) in self.bbox_lookup.items():
             # make sure this is only one-side inclusive to eliminate double-counting
-            in_time = (t >= t0) & (t < t1)
-            reduced = a[in_time]
-            if reduced.size > 0:
-                inpoly = poly_target.filter_mask(reduced)
+            in_time = np.flatnonzero((t >= t0) & (t < t1))
+            if in_time.size > 0:
                 # accept anything in this polygon at this time
-                good[in_time] |= inpoly
+                good[in_time] |= _in_poly(x[in_time], y[in_time], path, v_min, v_max)
+        return good
+
+    def filter_mask_soa(self, t, x, y):
+        """ As filter_mask, but with the time and the two coordinates
+            given as separate arrays instead of a named array. x and y must
+            have the same shape, and may be broadcast views. t may also
+            be a scalar time that applies to all points.
+            
+            Returns a boolean mask with the same shape as x.
+        """
+        good = np.zeros(x.shape, dtype=bool)
+        if np.ndim(t) == 0:
+            # The windows don't overlap, so only the one polygon valid
+            # at this time applies, and it applies to all points.
+            for (t0, t1), (path, v_min, v_max) in self.bbox_lookup.items():
+                if (t >= t0) & (t < t1):
+                    return _in_poly(x, y, path, v_min, v_max)
+            return good
+        
+        t = np.broadcast_to(t, x.shape)
+        for (t0, t1), (path, v_min, v_max) in self.bbox_lookup.items():
+            # make sure this is only one-side inclusive to eliminate double-counting
+            in_time = (t >= t0) & (t < t1)
+            if in_time.any():
+                good[in_time] |= _in_poly(x[in_time], y[in_time], path, v_min, v_max)
         return good
 
     
@@ -19,6 +19,7 @@ read_flashes -> filterer.filt_ev_fl -> length_for_these_flashes -> brancher -> t
 from __future__ import absolute_import
 from __future__ import print_function
 import os
+import logging
 
 import matplotlib.pyplot as plt
 from matplotlib.ticker import MultipleLocator
@@ -32,6 +33,8 @@ from lmatools.grid.make_grids import time_edges, seconds_since_start_of_day
 from stormdrain.pipeline import coroutine, Branchpoint
 from stormdrain.support.matplotlib.formatters import SecDayFormatter
 
+logger = logging.getLogger(__name__)
+
 def gen_fractal_length_for_flashes(events, flashes, D, b_s, alt_bins):
     """ Given events and flashes, calculate the fractal length
         as described in Bruning and MacGorman (2015). 
@@ -43,7 +46,7 @@ def gen_fractal_length_for_flashes(events, flashes, D, b_s, alt_bins):
     GeoSys = coordinateSystems.GeographicSystem()
     for fl_srcs, fl in gen_flash_events(events, flashes):
         if fl_srcs.shape[0] < 5:
-            print("Skipping flash because source count less than 5 prevents calculation of volume")
+            logger.debug("Skipping flash because source count less than 5 prevents calculation of volume")
             continue
         x,y,z = GeoSys.toECEF(fl_srcs['lon'], fl_srcs['lat'], fl_srcs['alt'])
         x,y,z = x/1000.0, y/1000.0, z/1000.0
@@ -271,9 +274,8 @@ def length_for_these_flashes(D, b_s, alt_bins, chi2=5.0, stations=5, target=None
             fl_srcs = pts[this_flash & good] 
             
             if fl_srcs.shape[0] < 5:
-                print(("Skipping flash because original source count reduced from {0}={4} to {1} for flash {2} at {3}".format(
-                    pts[this_flash].shape[0], fl_srcs.shape[0], fl_id, fl['start'], fl['n_points']
-                )))
+                logger.debug("Skipping flash because original source count reduced from %s=%s to %s for flash %s at %s",
+                    pts[this_flash].shape[0], fl['n_points'], fl_srcs.shape[0], fl_id, fl['start'])
                 continue
 
             x,y,z = GeoSys.toECEF(fl_srcs['lon'], fl_srcs['lat'], fl_srcs['alt'])
@@ -23,6 +23,8 @@ a few more del statements might be needed.
 
 from __future__ import absolute_import
 from __future__ import print_function
+import threading
+import queue
 import numpy as np
 
 
@@ -33,6 +35,57 @@ def coroutine(func):
         return cr
     return start
     
+def prefetch(iterable, maxsize=2):
+    """ Generate the items of iterable, which are produced in a background 
+        thread no more than maxsize items ahead of the consumer. This lets I/O
+        needed to produce the next item (for instance, reading an HDF5 file)
+        overlap with processing of the current item. 
+        
+        Exceptions raised by iterable are re-raised in the consumer. If the
+        consumer stops early and closes this generator, the background thread
+        stops after the item it is producing.
+    """
+    items = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+    done = object()
+    
+    def put(entry):
+        # Give up if the consumer has gone away, instead of blocking forever
+        # on a full queue.
+        while not stop.is_set():
+            try:
+                items.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+    
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except BaseException as err:
+            put((None, err))
+            return
+        put((done, None))
+    
+    producer = threading.Thread(target=produce)
+    producer.daemon = True
+    producer.start()
+    try:
+        while True:
+            item, err = items.get()
+            if err is not None:
+                raise err
+            if item is done:
+                break
+            yield item
+    finally:
+        # Also runs if the consumer stops early and the generator is closed.
+        stop.set()
+        producer.join()
+
 
 def split_clusters(data,labels):
     no_single = set(labels)
@@ -0,0 +1,46 @@
+import numpy as np
+from numpy.testing import assert_equal, assert_allclose
+
+from lmatools.flash_stats import bin_index, histogram_from_bin_index, get_energy_spectrum_bins
+
+def sample_values(bin_edges):
+    inside = np.linspace(bin_edges[0], bin_edges[-1], 101)
+    special = np.array([
+        bin_edges[0],   # first edge is in the first bin
+        bin_edges[5],   # interior edges belong to the bin on their right
+        bin_edges[-1],  # last edge is in the last bin
+        bin_edges[0]/2.0, -1.0,           # below the range
+        bin_edges[-1]*2.0, np.inf,        # above the range
+        np.nan,
+    ])
+    return np.hstack((inside, special))
+
+def test_histogram_matches_numpy():
+    bin_edges = get_energy_spectrum_bins()
+    n_bins = bin_edges.shape[0] - 1
+    a = sample_values(bin_edges)
+
+    idx = bin_index(a, bin_edges)
+    assert idx.shape == a.shape
+    assert (idx >= -1).all() & (idx < n_bins).all()
+
+    histo = histogram_from_bin_index(idx, n_bins)
+    np_histo, edges = np.histogram(a, bins=bin_edges)
+    assert histo.shape == (n_bins,)
+    assert_equal(histo, np_histo)
+
+def test_weighted_histogram_matches_numpy():
+    bin_edges = get_energy_spectrum_bins()
+    n_bins = bin_edges.shape[0] - 1
+    a = sample_values(bin_edges)
+    weights = np.arange(a.shape[0], dtype=float) + 0.5
+
+    idx = bin_index(a, bin_edges)
+    histo = histogram_from_bin_index(idx, n_bins, weights=weights)
+    np_histo, edges = np.histogram(a, bins=bin_edges, weights=weights)
+    assert_allclose(histo, np_histo)
+
+def test_out_of_range_and_nan():
+    bin_edges = np.array([1.0, 2.0, 3.0])
+    a = np.array([0.5, 1.0, 2.0, 3.0, 3.5, np.nan])
+    assert_equal(bin_index(a, bin_edges), [-1, 0, 1, 1, -1, -1])
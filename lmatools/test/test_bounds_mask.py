@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from numpy.testing import assert_equal
+
+import lmatools.lasso.cell_lasso_util as cell_lasso_util
+from lmatools.lasso.cell_lasso_util import bounds_mask
+from lmatools.lasso.cell_lasso_timeseries import SoAFlashes
+
+bounds = {'area': (1.0, 100.0),
+          'ctr_alt': (2.0, 10.0),
+          'total_energy': (0.0, 1e9),  # not a column below, so ignored
+          }
+
+def make_flashes(n=1000, seed=0):
+    rng = np.random.RandomState(seed)
+    flashes = np.empty((n,), dtype=[('area', 'f4'), ('ctr_alt', 'f8'), ('n_points', 'i4')])
+    flashes['area'] = rng.uniform(0.0, 150.0, size=n)
+    flashes['ctr_alt'] = rng.uniform(0.0, 15.0, size=n)
+    flashes['n_points'] = rng.randint(10, 1000, size=n)
+    # values on the (inclusive) bounds, and NaN
+    flashes['area'][:4] = [1.0, 100.0, np.nan, 50.0]
+    flashes['ctr_alt'][:4] = [2.0, 10.0, 5.0, np.nan]
+    return flashes
+
+def expected_mask(flashes):
+    return ((flashes['area'] >= 1.0) & (flashes['area'] <= 100.0) &
+            (flashes['ctr_alt'] >= 2.0) & (flashes['ctr_alt'] <= 10.0))
+
+def mask_variants(a, bounds, monkeypatch):
+    """ The mask from the numpy fallback, and from numexpr if installed """
+    monkeypatch.setattr(cell_lasso_util, 'ne', None)
+    masks = [bounds_mask(a, bounds)]
+    monkeypatch.undo()
+    if cell_lasso_util.ne is not None:
+        masks.append(bounds_mask(a, bounds))
+    return masks
+
+@pytest.mark.parametrize('n', [1000, 0])
+def test_bounds_mask(n, monkeypatch):
+    flashes = make_flashes(n)
+    expected = expected_mask(flashes)
+    for a in (flashes, SoAFlashes.from_records(flashes)):
+        for good in mask_variants(a, bounds, monkeypatch):
+            assert good.dtype == bool
+            assert good.shape == flashes.shape
+            assert_equal(good, expected)
+    if n > 0:
+        assert_equal(expected[:4], [True, True, False, False])
+
+def test_bounds_mask_no_matching_keys(monkeypatch):
+    flashes = make_flashes(10)
+    for good in mask_variants(flashes, {'total_energy': (0.0, 1.0)}, monkeypatch):
+        assert_equal(good, np.ones(flashes.shape, dtype=bool))
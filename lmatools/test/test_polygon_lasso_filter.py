@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+from numpy.testing import assert_equal
+from matplotlib.path import Path
+
+from lmatools.lasso.energy_stats import TimeSeriesPolygonLassoFilter
+
+basedate = datetime(2012, 5, 29)
+time_edges = [basedate + timedelta(seconds=s) for s in (0, 60, 120, 180)]
+polys = (
+    ((-1.0, -1.0), (1.0, -1.0), (1.0, 1.0), (-1.0, 1.0)),
+    ((0.0, 0.0), (2.0, 0.0), (1.0, 2.0)),
+    ((-2.0, -0.5), (0.5, -2.0), (0.5, 0.5), (-0.5, 1.5), (-2.0, 0.5)),
+)
+
+def make_filter():
+    return TimeSeriesPolygonLassoFilter(coord_names=('lon', 'lat'),
+                time_key='time', time_edges=time_edges, polys=polys,
+                basedate=basedate)
+
+def make_points(n=2000, seed=0):
+    rng = np.random.RandomState(seed)
+    a = np.empty((n,), dtype=[('time', 'f8'), ('lon', 'f8'), ('lat', 'f8')])
+    # includes times before the first and after the last window
+    a['time'] = rng.uniform(-30.0, 210.0, size=n)
+    a['lon'] = rng.uniform(-3.0, 3.0, size=n)
+    a['lat'] = rng.uniform(-3.0, 3.0, size=n)
+    return a
+
+def expected_mask(t, x, y):
+    good = np.zeros(x.shape, dtype=bool)
+    for i, verts in enumerate(polys):
+        t0 = (time_edges[i] - basedate).total_seconds()
+        t1 = (time_edges[i+1] - basedate).total_seconds()
+        in_time = (t >= t0) & (t < t1)
+        xy = np.column_stack((x.ravel(), y.ravel()))
+        good |= in_time & Path(verts).contains_points(xy).reshape(x.shape)
+    return good
+
+def test_filter_mask_matches_path():
+    a = make_points()
+    lasso = make_filter()
+    good = lasso.filter_mask(a)
+    assert_equal(good, expected_mask(a['time'], a['lon'], a['lat']))
+    assert good.any() and not good.all()
+
+def test_filter_mask_soa_array_time():
+    a = make_points()
+    lasso = make_filter()
+    good = lasso.filter_mask_soa(a['time'], a['lon'], a['lat'])
+    assert_equal(good, lasso.filter_mask(a))
+
+def test_filter_mask_soa_scalar_time():
+    a = make_points()
+    lasso = make_filter()
+    for t in (-10.0, 0.0, 30.0, 60.0, 150.0, 180.0):
+        a['time'] = t
+        good = lasso.filter_mask_soa(t, a['lon'], a['lat'])
+        assert_equal(good, lasso.filter_mask(a))
+
+def test_filter_mask_soa_broadcast_grid():
+    lasso = make_filter()
+    xedge = np.linspace(-3.0, 3.0, 41)
+    yedge = np.linspace(-3.0, 3.0, 31)
+    xsparse, ysparse = np.meshgrid(xedge, yedge, sparse=True)
+    x = np.broadcast_to(xsparse, (yedge.size, xedge.size))
+    y = np.broadcast_to(ysparse, (yedge.size, xedge.size))
+    for t in (30.0, 90.0, 150.0):
+        good = lasso.filter_mask_soa(t, x, y)
+        assert good.shape == x.shape
+        assert_equal(good, expected_mask(np.full(x.shape, t), x, y))
+        t_arr = np.full(x.shape, t)
+        assert_equal(lasso.filter_mask_soa(t_arr, x, y), good)
@@ -0,0 +1,37 @@
+import threading
+
+import pytest
+
+from lmatools.stream.subset import prefetch
+
+def test_prefetch_order():
+    assert list(prefetch(range(20))) == list(range(20))
+    assert list(prefetch(range(20), maxsize=1)) == list(range(20))
+    assert list(prefetch([])) == []
+
+def test_prefetch_reraises():
+    def failing():
+        yield 0
+        yield 1
+        raise RuntimeError("read failed")
+    
+    seen = []
+    with pytest.raises(RuntimeError, match="read failed"):
+        for item in prefetch(failing()):
+            seen.append(item)
+    assert seen == [0, 1]
+
+def test_prefetch_early_close():
+    produced = []
+    def counting():
+        for i in range(1000):
+            produced.append(i)
+            yield i
+    
+    n_threads = threading.active_count()
+    gen = prefetch(counting(), maxsize=2)
+    assert next(gen) == 0
+    gen.close()
+    # the producer has stopped well short of the end and its thread has exited
+    assert len(produced) < 10
+    assert threading.active_count() == n_threads
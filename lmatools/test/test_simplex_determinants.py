@@ -0,0 +1,28 @@
+import numpy as np
+from numpy.testing import assert_allclose
+
+from lmatools.flashsort.flash_stats import _simplex_determinants
+
+def determinant_kernels():
+    kernels = [_simplex_determinants]
+    # the pure Python version, when the numba JIT is in use
+    if hasattr(_simplex_determinants, 'py_func'):
+        kernels.append(_simplex_determinants.py_func)
+    return kernels
+
+def test_simplex_determinants_match_linalg():
+    rng = np.random.RandomState(0)
+    for n in (0, 1, 7, 100):
+        q = rng.normal(scale=1000.0, size=(n, 3, 3))
+        expected = np.linalg.det(q) if n > 0 else np.empty((0,))
+        for kernel in determinant_kernels():
+            det = kernel(q)
+            assert det.shape == (n,)
+            assert det.dtype == np.float64
+            assert_allclose(det, expected, rtol=1e-10, atol=1e-6)
+
+def test_simplex_determinants_singular():
+    # coplanar points give a degenerate simplex of zero volume
+    q = np.array([[[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [1.0, 1.0, 0.0]]])
+    for kernel in determinant_kernels():
+        assert_allclose(kernel(q), [0.0])
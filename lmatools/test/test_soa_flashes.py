@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+from numpy.testing import assert_equal
+
+from lmatools.lasso.cell_lasso_timeseries import SoAFlashes
+
+def make_flashes():
+    dtype = [('flash_id', 'i4'), ('start', 'f8'), ('area', 'f4'), ('CG', 'bool')]
+    flashes = np.zeros((5,), dtype=dtype)
+    flashes['flash_id'] = np.arange(5)
+    flashes['start'] = [0.5, 1.5, 2.5, 3.5, 4.5]
+    flashes['area'] = [10.0, 20.0, 30.0, 40.0, 50.0]
+    flashes['CG'] = [False, True, False, False, True]
+    return flashes
+
+def test_field_access():
+    flashes = make_flashes()
+    soa = SoAFlashes.from_records(flashes)
+    assert soa.shape == (5,)
+    assert len(soa) == 5
+    assert soa.dtype.names == flashes.dtype.names
+    for k in flashes.dtype.names:
+        assert_equal(soa[k], flashes[k])
+        assert soa[k].flags['C_CONTIGUOUS']
+
+def test_missing_field_is_value_error():
+    # flash_size_stats relies on a ValueError, as for a record array
+    soa = SoAFlashes.from_records(make_flashes())
+    try:
+        soa['total_energy']
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Expected ValueError for a missing field")
+
+def test_indexing():
+    flashes = make_flashes()
+    soa = SoAFlashes.from_records(flashes)
+
+    sliced = soa[1:4]
+    assert sliced.shape == (3,)
+    assert_equal(sliced['area'], flashes['area'][1:4])
+    # a slice of a column is a view, not a copy
+    assert np.shares_memory(sliced['area'], soa['area'])
+
+    mask = flashes['CG']
+    masked = soa[mask]
+    assert masked.shape == (2,)
+    assert_equal(masked.to_records(), flashes[mask])
+
+    idx = np.array([4, 0, 2])
+    fancy = soa[idx]
+    assert fancy.shape == (3,)
+    assert_equal(fancy.to_records(), flashes[idx])
+
+def test_records_round_trip():
+    flashes = make_flashes()
+    soa = SoAFlashes.from_records(flashes)
+    records = soa.to_records()
+    assert records.dtype == flashes.dtype
+    assert_equal(records, flashes)
+    # iteration yields records
+    for fl, fl_orig in zip(soa, flashes):
+        assert fl['flash_id'] == fl_orig['flash_id']
+        assert fl['CG'] == fl_orig['CG']
+
+def test_from_record_chunks():
+    flashes = make_flashes()
+    chunks = [flashes[:2], flashes[2:2], flashes[2:]]
+    soa = SoAFlashes.from_record_chunks(chunks)
+    assert soa.shape == (5,)
+    assert soa.dtype == flashes.dtype
+    assert_equal(soa.to_records(), flashes)
+
+def test_integer_index():
+    flashes = make_flashes()
+    soa = SoAFlashes.from_records(flashes)
+    for i in (0, 3, -1, np.int64(2)):
+        fl = soa[i]
+        assert fl.dtype == flashes.dtype
+        assert fl == flashes[i]
+        assert fl['area'] == flashes['area'][i]
+
+def test_boolean_mask_matches_records():
+    flashes = make_flashes()
+    soa = SoAFlashes.from_records(flashes)
+    for mask in (flashes['area'] > 25.0, np.zeros(5, dtype=bool), np.ones(5, dtype=bool)):
+        masked = soa[mask]
+        assert masked.shape == flashes[mask].shape
+        assert_equal(masked.to_records(), flashes[mask])
+
+def test_from_record_chunks_empty():
+    with pytest.raises(ValueError):
+        SoAFlashes.from_record_chunks([])
+    # chunks with no rows still give an empty table of the right dtype
+    flashes = make_flashes()
+    soa = SoAFlashes.from_record_chunks([flashes[:0], flashes[:0]])
+    assert soa.shape == (0,)
+    assert soa.dtype == flashes.dtype
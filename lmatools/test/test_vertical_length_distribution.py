@@ -0,0 +1,53 @@
+import numpy as np
+from numpy.testing import assert_equal, assert_allclose
+
+from lmatools.flash_stats import vertical_length_distribution
+
+def loop_vertical_length_distribution(src_alt, simplex_alt, simplex_lengths, 
+        alt_bins, norm=True):
+    """ The original per-source and per-simplex loop, for reference """
+    d_alt = alt_bins[1:]-alt_bins[:-1]
+    bin_total_length = np.zeros(alt_bins.shape[0]-1, dtype=float)
+    bin_total_src = np.zeros(alt_bins.shape[0]-1, dtype=float)
+    tri_bin_idx = np.digitize(simplex_alt, alt_bins)
+    src_bin_idx = np.digitize(src_alt,alt_bins)
+    tri_bin_idx[tri_bin_idx>(bin_total_length.shape[0]-1)]=bin_total_length.shape[0]-1
+    src_bin_idx[src_bin_idx>(bin_total_src.shape[0]-1)]=bin_total_src.shape[0]-1
+    for idx in src_bin_idx:
+        bin_total_src[idx] += 1
+    for lw,idx in zip(simplex_lengths,tri_bin_idx):
+        bin_total_length[idx]+=lw
+    if norm==True:
+        return alt_bins, bin_total_src/d_alt, bin_total_length/d_alt
+    else:
+        return alt_bins, bin_total_src, bin_total_length
+
+def test_vertical_length_distribution_matches_loop():
+    rng = np.random.RandomState(0)
+    alt_bins = np.arange(0.0, 20.5, 0.5)
+    # includes altitudes below the bins, above the bins (clipped into the top
+    # bin), and exactly on the edges
+    src_alt = rng.uniform(-2.0, 25.0, size=500)
+    src_alt[:4] = [0.0, 20.0, 19.75, -0.1]
+    simplex_alt = rng.uniform(-2.0, 25.0, size=300)
+    simplex_alt[:4] = [0.0, 20.0, 19.75, -0.1]
+    simplex_lengths = rng.uniform(0.0, 5.0, size=300)
+    for norm in (True, False):
+        bins, src, length = vertical_length_distribution(src_alt, simplex_alt,
+                                simplex_lengths, alt_bins, norm=norm)
+        bins_ref, src_ref, length_ref = loop_vertical_length_distribution(
+                                src_alt, simplex_alt, simplex_lengths, alt_bins, norm=norm)
+        assert_equal(bins, bins_ref)
+        assert src.dtype == float and length.dtype == float
+        assert src.shape == (alt_bins.shape[0]-1,)
+        assert length.shape == (alt_bins.shape[0]-1,)
+        assert_equal(src, src_ref)
+        assert_allclose(length, length_ref, rtol=1e-12)
+
+def test_vertical_length_distribution_empty():
+    alt_bins = np.arange(0.0, 20.5, 0.5)
+    empty = np.empty((0,), dtype=float)
+    bins, src, length = vertical_length_distribution(empty, empty, empty, 
+                                                     alt_bins, norm=False)
+    assert_equal(src, np.zeros(alt_bins.shape[0]-1))
+    assert_equal(length, np.zeros(alt_bins.shape[0]-1))